@@ -41,15 +41,23 @@ def run_migrations_online():
     """Run migrations in 'online' mode -- using the actual Librarian database
     connection.
 
+    SQLite can't do most ALTER TABLE operations, so when a new migration is
+    autogenerated against it, we have Alembic write its operations in "batch"
+    mode, which copies each altered table wholesale. This only affects
+    `alembic revision --autogenerate`, not how existing migrations run.
+
+    We reuse the Librarian's own engine rather than making a new one, and run
+    everything in a single transaction that is committed when the block
+    exits, or rolled back if anything goes wrong.
+
     """
-    with db.engine.connect() as connection:
+    with db.engine.begin() as connection:
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            render_as_batch=(connection.dialect.name == 'sqlite')
         )
-
-        with context.begin_transaction():
-            context.run_migrations()
+        context.run_migrations()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 the HERA Collaboration
+# Licensed under the 2-clause BSD License.
+
+"""Add index on FileEvent.type and FileEvent.name.
+
+Revision ID: 17766354c260
+Revises: 464899566429
+Create Date: 2026-10-16 09:41:27.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '17766354c260'
+down_revision = '464899566429'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('file_event_type_name', 'file_event', ['type', 'name'], unique=False)
+
+
+def downgrade():
+    op.drop_index('file_event_type_name', table_name='file_event')
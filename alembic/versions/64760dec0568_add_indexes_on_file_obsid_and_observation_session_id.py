@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Copyright 2026 the HERA Collaboration
+# Licensed under the 2-clause BSD License.
+
+"""Add indexes on File.obsid and Observation.session_id.
+
+Revision ID: 64760dec0568
+Revises: 17766354c260
+Create Date: 2026-10-16 10:27:53.811462
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '64760dec0568'
+down_revision = '17766354c260'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('file_obsid', 'file', ['obsid'], unique=False)
+    op.create_index('observation_session_id', 'observation', ['session_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('observation_session_id', table_name='observation')
+    op.drop_index('file_obsid', table_name='file')
@@ -70,6 +70,14 @@ class LibrarianClient(object):
     config = None
     "The JSON config fragment corresponding to the desired connection."
 
+    _connection = None
+    "A persistent HTTP connection to the Librarian, created on first use."
+
+    _post_headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+    _ping_params = None
+    "The encoded body of an argument-free ping, created on first use."
+
     def __init__(self, conn_name, conn_config=None):
         """If `conn_config` is not None, it should be a dict containing at least the
         entries "authenticator" and "url" that define how to talk to the
@@ -90,6 +98,18 @@ class LibrarianClient(object):
             if self.config is None:
                 raise NoSuchConnectionError(conn_name)
 
+        # Work out where the RPC API lives once, rather than on every call. We
+        # accept URLs with or without a trailing slash.
+        self._api_url = self.config['url'].rstrip('/') + '/api/'
+        parts = urllib.parse.urlsplit(self._api_url)
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+        self._api_path = parts.path
+
+        # Likewise, getproxies() rescans the whole environment every time it's
+        # called, so just check for a proxy here.
+        self._use_proxy = urllib.request.getproxies().get(self._scheme) is not None
+
     def _do_http_post(self, operation, **kwargs):
         """do a POST operation, passing a JSON version of the request and expecting a
         JSON reply; return the decoded version of the latter.
@@ -102,12 +122,21 @@ class LibrarianClient(object):
         req_json = json.dumps(kwargs)
 
         params = urllib.parse.urlencode({'request': req_json}).encode("utf-8")
-        url = self.config['url'] + 'api/' + operation
-        try:
-            f = urllib.request.urlopen(url, params)
-            reply = f.read()
-        except urllib.error.HTTPError as err:
-            reply = err.read()
+        return self._do_encoded_http_post(operation, kwargs, params)
+
+    def _do_encoded_http_post(self, operation, kwargs, params):
+        """Like `_do_http_post`, but for a request that has already been encoded
+        into `params`. `kwargs` is only used for error reporting.
+
+        """
+        status, content_type, reply = self._post(operation, params)
+
+        # Failed API calls come back as JSON with a 4xx/5xx status, and we
+        # want their messages. Anything else that isn't a success (e.g., an
+        # HTML error page from a proxy) isn't worth trying to decode.
+        if not 200 <= status < 300 and not content_type.startswith('application/json'):
+            raise RPCError(kwargs, 'HTTP error %d: %r' % (status, reply[:200]))
+
         try:
             reply_json = json.loads(reply)
         except ValueError:
@@ -119,8 +148,88 @@ class LibrarianClient(object):
 
         return reply_json
 
+    def _post(self, operation, params):
+        """POST urlencoded `params` to the API endpoint for `operation` and return a
+        tuple ``(status, content_type, body)`` describing the reply, whatever
+        its HTTP status.
+
+        A single upload takes several RPC calls, so we keep one HTTP
+        connection to the Librarian open and reuse it across calls rather
+        than paying for a new TCP (and maybe TLS) handshake every time. If
+        a proxy is configured, we leave things to urllib.
+
+        """
+        import http.client
+
+        if self._use_proxy:
+            try:
+                resp = urllib.request.urlopen(self._api_url + operation, params)
+            except urllib.error.HTTPError as err:
+                resp = err
+            return resp.getcode(), resp.headers.get('Content-Type', ''), resp.read()
+
+        path = self._api_path + operation
+        headers = self._post_headers
+
+        for attempt in range(2):
+            if self._connection is None:
+                if self._scheme == 'https':
+                    self._connection = http.client.HTTPSConnection(self._netloc)
+                else:
+                    self._connection = http.client.HTTPConnection(self._netloc)
+
+            # If the server has closed an idle connection on us, sending the
+            # request fails, or the server hangs up without sending back a
+            # single byte. Only then do we know that the request wasn't acted
+            # upon, so that it's safe to try again once with a fresh
+            # connection: many of our RPCs are not idempotent. Any other
+            # failure (timeouts, TLS errors) is passed on to the caller. Either
+            # way, the connection is unusable afterwards, so drop it.
+            reused = self._connection.sock is not None
+            sent = False
+
+            try:
+                self._connection.request('POST', path, params, headers)
+                sent = True
+                resp = self._connection.getresponse()
+                return resp.status, resp.getheader('Content-Type', ''), resp.read()
+            except (http.client.HTTPException, OSError) as e:
+                self.close()
+
+                if sent:
+                    stale = isinstance(e, http.client.RemoteDisconnected)
+                else:
+                    stale = isinstance(e, (BrokenPipeError, ConnectionResetError))
+
+                if not (stale and reused) or attempt > 0:
+                    raise
+
+    def close(self):
+        """Close the persistent HTTP connection to the Librarian, if any. It will
+        be reopened if more calls are made.
+
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def ping(self, **kwargs):
-        return self._do_http_post('ping', **kwargs)
+        if kwargs:
+            return self._do_http_post('ping', **kwargs)
+
+        # Plain pings are used as health checks and can be frequent; their
+        # body never changes, so only encode it once.
+        req = {'authenticator': self.config['authenticator']}
+        if self._ping_params is None:
+            self._ping_params = urllib.parse.urlencode(
+                {'request': json.dumps(req)}).encode("utf-8")
+        return self._do_encoded_http_post('ping', req, self._ping_params)
 
     def probe_stores(self, **kwargs):
         return self._do_http_post('probe_stores', **kwargs)
@@ -302,10 +411,16 @@ class LibrarianClient(object):
             # get the relevant destination info from config file
             destination_endpoint_id = self.config.get("globus_endpoint_id", None)
             host_path = self.config.get("globus_host_path", None)
+            perf_cc = self.config.get("globus_perf_cc", None)
+            perf_p = self.config.get("globus_perf_p", None)
+            perf_pp = self.config.get("globus_perf_pp", None)
+            verify_checksum = self.config.get("globus_verify_checksum", False)
         else:
             source_endpoint_id = None
             destination_endpoint_id = None
             host_path = None
+            perf_cc = perf_p = perf_pp = None
+            verify_checksum = False
 
         # Now, (try to) actually copy the data. This runs an SCP, potentially
         # across the globe, that in the real world will occasionally stall or
@@ -321,6 +436,10 @@ class LibrarianClient(object):
             source_endpoint_id,
             destination_endpoint_id,
             host_path,
+            perf_cc=perf_cc,
+            perf_p=perf_p,
+            perf_pp=perf_pp,
+            verify_checksum=verify_checksum,
         )
 
         # If we made it here, though, the upload succeeded and we can tell
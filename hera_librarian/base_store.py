@@ -16,6 +16,7 @@ __all__ = str('''
 BaseStore
 ''').split()
 
+import itertools
 import subprocess
 import os.path
 import time
@@ -25,6 +26,16 @@ from . import RPCError
 
 NUM_RSYNC_TRIES = 6
 
+# How often to check on a globus transfer. A finished transfer isn't noticed
+# until the next check, and standing orders run one transfer per file, so long
+# intervals directly slow down uploads. We poll at the minimum interval for
+# the first couple of minutes, covering most transfers, and only then back off
+# gently, so that the extra wait stays small compared to the transfer itself.
+GLOBUS_MIN_POLL_INTERVAL = 5  # seconds
+GLOBUS_MAX_POLL_INTERVAL = 20  # seconds
+GLOBUS_POLL_BACKOFF_AFTER = 120  # seconds
+GLOBUS_MAX_ERROR_EVENTS = 10
+
 
 class BaseStore(object):
     """Note that the Librarian server code subclasses this class, so do not change
@@ -160,6 +171,56 @@ class BaseStore(object):
         if not success:
             raise RPCError(argv, 'exit code %d; output:\n\n%r' % (proc.returncode, output))
 
+    # Globus TransferClients, keyed by (client_id, transfer_token). Building
+    # one involves an OAuth round-trip to refresh the access token, so we
+    # share them across transfers and store instances. The
+    # RefreshTokenAuthorizer renews its access token by itself when it
+    # expires, so cached clients never go stale.
+    _globus_transfer_clients = {}
+
+    @classmethod
+    def _get_globus_transfer_client(cls, client_id, transfer_token):
+        """Get a globus TransferClient for the given credentials, creating it if
+        needed.
+
+        Parameters
+        ----------
+        client_id : str
+            The globus client ID to use for the transfer.
+        transfer_token : str
+            The globus transfer token to use for the transfer.
+
+        Returns
+        -------
+        globus_sdk.TransferClient
+            A transfer client authorized with the given credentials.
+
+        Raises
+        ------
+        RPCError
+            Raised if globus authentication fails.
+        """
+        key = (client_id, transfer_token)
+        tc = cls._globus_transfer_clients.get(key)
+        if tc is not None:
+            return tc
+
+        import globus_sdk
+        from globus_sdk.exc import AuthAPIError
+
+        client = globus_sdk.NativeAppAuthClient(client_id)
+        try:
+            authorizer = globus_sdk.RefreshTokenAuthorizer(transfer_token, client)
+        except AuthAPIError:
+            raise RPCError(
+                "globus authorization",
+                "globus authentication failed. Please check client_id and "
+                "authentication token and try again."
+            )
+        tc = globus_sdk.TransferClient(authorizer=authorizer)
+        cls._globus_transfer_clients[key] = tc
+        return tc
+
     def _globus_transfer(
         self,
         local_path,
@@ -169,6 +230,10 @@ class BaseStore(object):
         source_endpoint_id,
         destination_endpoint_id,
         host_path,
+        perf_cc=None,
+        perf_p=None,
+        perf_pp=None,
+        verify_checksum=False,
     ):
         """Copy a file to a particular path using globus.
 
@@ -194,6 +259,20 @@ class BaseStore(object):
         host_path : str, optional
             The `host_path` of the globus store. When using shared endpoints,
             this is the root directory presented to the client.
+        perf_cc : int, optional
+            The number of concurrent GridFTP processes to use for the task.
+            Like the other performance options, this only takes effect on
+            managed endpoints; if None, the globus default is used.
+        perf_p : int, optional
+            The number of parallel TCP streams to use per GridFTP process.
+        perf_pp : int, optional
+            The GridFTP pipelining depth to use.
+        verify_checksum : bool, optional
+            Whether globus should checksum the files at both ends after
+            transferring them. This makes the destination endpoint re-read all
+            of the data, and is redundant with the MD5 check that the
+            Librarian does when the upload is completed, so it is off by
+            default.
 
         Returns
         -------
@@ -207,7 +286,6 @@ class BaseStore(object):
         """
         try:
             import globus_sdk
-            from globus_sdk.exc import AuthAPIError
         except ModuleNotFoundError:
             raise RPCError(
                 "globus_sdk import",
@@ -223,65 +301,78 @@ class BaseStore(object):
                 "specified to initiate globus transfer."
             )
 
-        # make globus transfer client
-        client = globus_sdk.NativeAppAuthClient(client_id)
-        try:
-            authorizer = globus_sdk.RefreshTokenAuthorizer(transfer_token, client)
-        except AuthAPIError:
-            raise RPCError(
-                "globus authorization",
-                "globus authentication failed. Please check client_id and "
-                "authentication token and try again."
-            )
-        tc = globus_sdk.TransferClient(authorizer=authorizer)
+        # make (or reuse) a globus transfer client
+        tc = self._get_globus_transfer_client(client_id, transfer_token)
 
-        # make a new data transfer object
+        # make a new data transfer object. We upload into fresh staging
+        # directories, so the cheapest sync level is all we need, and the
+        # Librarian verifies the MD5 of the data itself once the upload is
+        # complete.
         basename = os.path.basename(os.path.normpath(local_path))
         tdata = globus_sdk.TransferData(
             tc,
             source_endpoint_id,
             destination_endpoint_id,
-            sync_level="checksum",
+            sync_level="exists",
+            verify_checksum=verify_checksum,
             label=basename,
             notify_on_succeeded=False,
             notify_on_failed=True,
             notify_on_inactive=True,
         )
 
-        # format the path correctly
+        # optional performance tuning; leave these out of the task document
+        # entirely unless asked for, so that globus picks its own defaults
+        for key, value in (("perf_cc", perf_cc), ("perf_p", perf_p), ("perf_pp", perf_pp)):
+            if value is not None:
+                tdata[key] = value
+
+        # format the path correctly: make it relative to the host path, if
+        # any. Compare against the host path with a trailing "/" so that a
+        # host path of "/data" does not match a store path in "/database".
         store_path = self._path(store_path)
         if host_path is not None:
-            if store_path.startswith(host_path):
-                store_path = store_path[len(host_path):]
-                # trim off leading "/" if present
-                if store_path.startswith("/"):
-                    store_path = store_path.lstrip("/")
+            host_prefix = host_path.rstrip("/") + "/"
+            if store_path.startswith(host_prefix):
+                store_path = store_path[len(host_prefix):].lstrip("/")
 
         # add data to be transferred
-        if os.path.isdir(local_path):
-            recursive = True
-        else:
-            recursive = False
-        tdata.add_item(local_path, store_path, recursive=recursive)
+        tdata.add_item(local_path, store_path, recursive=os.path.isdir(local_path))
 
         # initiate transfer
         transfer_result = tc.submit_transfer(tdata)
 
-        # get task_id and query status until it finishes
+        # get task_id and query status until it finishes. Transfers can take
+        # hours, so once one has been going for a while we poll less often
+        # rather than hitting the globus API every few seconds throughout.
         task_id = transfer_result["task_id"]
+        t0 = time.monotonic()
+        poll_interval = GLOBUS_MIN_POLL_INTERVAL
         while True:
+            # a task is never done the instant it's submitted, so wait before
+            # asking about it rather than spending a round-trip to find that out
+            time.sleep(poll_interval)
+            if time.monotonic() - t0 > GLOBUS_POLL_BACKOFF_AFTER:
+                poll_interval = min(1.5 * poll_interval, GLOBUS_MAX_POLL_INTERVAL)
+
             task = tc.get_task(task_id)
             if task["status"] == "SUCCEEDED":
                 return
             elif task["status"] == "FAILED":
-                # get the events associated with this transfer to help with debugging
+                # get the error events associated with this transfer to help
+                # with debugging. Long transfers can log a great many events,
+                # so only keep the most recent errors. The filtering arguments
+                # to task_event_list differ between globus_sdk versions, so we
+                # do it ourselves.
                 events = tc.task_event_list(task_id)
-                error_string = ""
-                for event in events:
-                    error_string.append(event["time"] + ": " + event["description"] + "\n")
-                raise RPCError("globus transfer", 'events:\n\n%r' % (error_string))
-            else:  # task is "ACTIVE"
-                time.sleep(5)
+                errors = itertools.islice(
+                    (event for event in events if event["is_error"]), GLOBUS_MAX_ERROR_EVENTS
+                )
+                error_string = "".join(
+                    event["time"] + ": " + event["description"] + "\n" for event in errors
+                )
+                raise RPCError("globus transfer", 'events:\n\n%s' % (error_string))
+            # otherwise the task is still "ACTIVE"; keep waiting
 
     # Modifications of the store host. These should always be paired with
     # appropriate modifications of the Librarian server database, either
@@ -298,6 +389,10 @@ class BaseStore(object):
         source_endpoint_id=None,
         destination_endpoint_id=None,
         host_path=None,
+        perf_cc=None,
+        perf_p=None,
+        perf_pp=None,
+        verify_checksum=False,
     ):
         """Transfer a file to a particular path in the store.
 
@@ -327,6 +422,15 @@ class BaseStore(object):
             The `host_path` of the globus store. When using shared endpoints,
             this is the root directory presented to the client. Note that this
             may be different from the `path_prefix` for a given store.
+        perf_cc : int, optional
+            The number of concurrent GridFTP processes for a globus transfer.
+        perf_p : int, optional
+            The number of parallel TCP streams per GridFTP process for a globus
+            transfer.
+        perf_pp : int, optional
+            The GridFTP pipelining depth for a globus transfer.
+        verify_checksum : bool, optional
+            Whether globus should verify checksums after a globus transfer.
 
         Returns
         -------
@@ -342,6 +446,10 @@ class BaseStore(object):
                     source_endpoint_id,
                     destination_endpoint_id,
                     host_path,
+                    perf_cc=perf_cc,
+                    perf_p=perf_p,
+                    perf_pp=perf_pp,
+                    verify_checksum=verify_checksum,
                 )
             except RPCError as e:
                 # something went wrong with globus--fall back on rsync
@@ -473,7 +581,7 @@ class BaseStore(object):
 
         """
         import time
-        now = time.time()
+        now = time.monotonic()  # only used for the cache age; immune to clock jumps
 
         # 30 second lifetime:
         if self._cached_space_info is not None and now - self._space_info_timestamp < 30:
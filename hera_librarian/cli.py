@@ -966,8 +966,14 @@ def stage_files(args):
         t0 = time.time()
         print("Started waiting for staging to finish at:", time.asctime(time.localtime(t0)))
 
+        # Check quickly at first, since small stagings finish fast, but don't
+        # let the interval grow so large that the user is left waiting long
+        # after the staging is actually done.
+        poll_interval = 1
+
         while os.path.exists(marker_path):
-            time.sleep(3)
+            time.sleep(poll_interval)
+            poll_interval = min(2 * poll_interval, 5)
 
         if os.path.exists(os.path.join(dest, "STAGING-SUCCEEDED")):
             print("Staging completed successfully ({:0.1f}s elapsed).".format(time.time() - t0))
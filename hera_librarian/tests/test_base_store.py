@@ -12,6 +12,8 @@ import os
 import tempfile
 import json
 import shutil
+import sys
+import types
 from hera_librarian import base_store, RPCError
 
 from . import ALL_FILES, filetypes, obsids, md5sums, pathsizes
@@ -71,6 +73,96 @@ def test_copy_to_store(tmpdir, local_store):
     return
 
 
+class FakeTransferData(dict):
+    """Stand-in for globus_sdk.TransferData."""
+
+    def __init__(self, tc, source_endpoint, destination_endpoint, **kwargs):
+        super(FakeTransferData, self).__init__(kwargs)
+        self.items = []
+
+    def add_item(self, source_path, destination_path, recursive=False):
+        self.items.append((source_path, destination_path, recursive))
+
+
+class FailingTransferClient(object):
+    """Stand-in for a globus TransferClient whose tasks always fail.
+
+    `task_event_list` has the globus_sdk v3 signature, which does not accept the
+    v2 filtering arguments.
+    """
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit_transfer(self, tdata):
+        self.submitted.append(tdata)
+        return {"task_id": "fake-task"}
+
+    def get_task(self, task_id):
+        return {"status": "FAILED"}
+
+    def task_event_list(self, task_id, limit=None, offset=None, query_params=None):
+        events = []
+        for i in range(20):
+            events.append({"time": "t%d" % i, "description": "error %d" % i, "is_error": True})
+            events.append({"time": "t%d" % i, "description": "info %d" % i, "is_error": False})
+        return iter(events)
+
+
+@pytest.fixture
+def failing_globus(monkeypatch):
+    monkeypatch.setitem(sys.modules, "globus_sdk", types.SimpleNamespace(TransferData=FakeTransferData))
+    monkeypatch.setattr(base_store.time, "sleep", lambda interval: None)
+    tc = FailingTransferClient()
+    monkeypatch.setattr(
+        base_store.BaseStore, "_get_globus_transfer_client", lambda self, client_id, token: tc
+    )
+    return tc
+
+
+def test_globus_transfer_failure(local_store, failing_globus):
+    with pytest.raises(RPCError) as excinfo:
+        local_store[0]._globus_transfer(
+            "/tmp/my_file.txt", "my_file.txt", "client", "token", "source", "dest", None
+        )
+
+    # only the most recent error events are reported
+    message = str(excinfo.value)
+    assert "error 0" in message
+    assert "error %d" % (base_store.GLOBUS_MAX_ERROR_EVENTS - 1) in message
+    assert "error %d" % base_store.GLOBUS_MAX_ERROR_EVENTS not in message
+    assert "info" not in message
+
+    # clean up
+    shutil.rmtree(os.path.join(local_store[1]))
+
+    return
+
+
+def test_copy_to_store_globus_fallback(local_store, failing_globus, monkeypatch):
+    # a failed globus transfer should fall back on rsync
+    rsynced = []
+    monkeypatch.setattr(
+        local_store[0], "_rsync_transfer", lambda local_path, store_path: rsynced.append((local_path, store_path))
+    )
+    local_store[0].copy_to_store(
+        "/tmp/my_file.txt",
+        "my_file.txt",
+        try_globus=True,
+        client_id="client",
+        transfer_token="token",
+        source_endpoint_id="source",
+        destination_endpoint_id="dest",
+    )
+    assert len(failing_globus.submitted) == 1
+    assert rsynced == [("/tmp/my_file.txt", "my_file.txt")]
+
+    # clean up
+    shutil.rmtree(os.path.join(local_store[1]))
+
+    return
+
+
 def test_chmod(local_store):
     # make a small test file on the store, then change permissions
     tempdir = local_store[1]
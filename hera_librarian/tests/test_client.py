@@ -0,0 +1,117 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright 2019 the HERA Collaboration
+# Licensed under the 2-clause BSD License
+
+"""Test the HTTP handling of hera_librarian.LibrarianClient
+
+"""
+
+
+import pytest
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from hera_librarian import LibrarianClient
+
+
+class PingHandler(BaseHTTPRequestHandler):
+    """Answer every POST with a successful JSON reply that says which client port
+    it came from, so that tests can tell whether connections were reused.
+
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.hits += 1
+        body = json.dumps({"success": True, "port": self.client_address[1]}).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        # Hang up without warning the client, like a server dropping an
+        # idle keep-alive connection.
+        if self.server.close_after_reply:
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def ping_server():
+    server = HTTPServer(("127.0.0.1", 0), PingHandler)
+    server.close_after_reply = False
+    server.hits = 0
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(ping_server, monkeypatch):
+    for var in ("http_proxy", "HTTP_PROXY"):
+        monkeypatch.delenv(var, raising=False)
+
+    url = "http://127.0.0.1:%d/" % ping_server.server_address[1]
+    client = LibrarianClient("test", {"url": url, "authenticator": "I am a bot"})
+    yield client
+    client.close()
+
+
+def test_connection_reuse(client):
+    # consecutive calls should go over the same connection
+    ports = [client.ping()["port"] for _ in range(3)]
+    assert len(set(ports)) == 1
+
+    return
+
+
+def test_server_closes_connection(client, ping_server):
+    # if the server hangs up between calls, the client should reconnect and
+    # send the request just once
+    ping_server.close_after_reply = True
+    first = client.ping()["port"]
+    second = client.ping()["port"]
+    assert first != second
+    assert ping_server.hits == 2
+
+    # and keep working normally afterwards
+    ping_server.close_after_reply = False
+    assert client.ping()["port"] == client.ping()["port"]
+
+    return
+
+
+def test_socket_error_on_reused_connection(client, ping_server, monkeypatch):
+    # a timeout after the request has gone out must not cause the request to
+    # be sent again, since the server may have already acted on it. But it
+    # shouldn't leave a broken connection behind for the next call either.
+    first = client.ping()["port"]
+    connection = client._connection
+
+    def fail(*args, **kwargs):
+        raise socket.timeout("timed out")
+
+    monkeypatch.setattr(connection, "getresponse", fail)
+
+    with pytest.raises(socket.timeout):
+        client.ping()
+
+    assert client._connection is None
+
+    # the server handles one connection at a time, so by now it has seen
+    # every request exactly once
+    second = client.ping()["port"]
+    assert first != second
+    assert ping_server.hits == 3
+
+    return
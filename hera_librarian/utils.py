@@ -25,9 +25,9 @@ format_obsid_as_calendar_date
 ''').split()
 
 import hashlib
-import locale
 import os.path
 import re
+import stat
 
 import numpy as np
 
@@ -41,6 +41,9 @@ def get_type_from_path(path):
     return path.split('.')[-1]
 
 
+_pol_pattern = re.compile(r'\.([xy][xy])\.')
+
+
 def get_pol_from_path(path):
     """Get the data polarization from a path, assuming it follows HERA naming
     conventions. Returns None if nothing pol-like is seen.
@@ -52,7 +55,7 @@ def get_pol_from_path(path):
     information for it to ingest files from us. Is that still the case?
 
     """
-    matches = re.findall(r'\.([xy][xy])\.', path)
+    matches = _pol_pattern.findall(path)
     if not len(matches):
         return None
     return matches[-1]
@@ -99,23 +102,53 @@ def normalize_and_validate_md5(text):
 
     """
     norm_text = text.strip().lower()
-    if not len(_lc_md5_pattern.findall(norm_text)):
+    if _lc_md5_pattern.match(norm_text) is None:
         raise ValueError('%r does not look like an MD5 sum' % (text,))
     return norm_text
 
 
-def _md5_of_file(path):
-    """Compute and return the MD5 sum of a flat file. The MD5 is returned as a
-    hexadecimal string.
+_MD5_BUFFER_SIZE = 1024 * 1024
+_MD5_DIR_THREADS = 4
+
+
+def _md5_and_size_of_file(path):
+    """Compute the MD5 sum and size of a flat file. Returns a tuple `(md5, size)`,
+    where the MD5 is a hexadecimal string and the size is in bytes.
+
+    Our files can be large, so we read into a single reusable buffer rather
+    than allocating a new bytes object for every chunk, and tell the kernel
+    that we'll be reading straight through the file, so that it can read
+    ahead more aggressively. We deliberately don't mmap the file: if it were
+    truncated or replaced while we were hashing it (say, because it's still
+    being written), touching the vanished pages would kill the whole process
+    with SIGBUS, whereas reading just gives us a wrong MD5 that the Librarian
+    will reject.
 
     """
     md5 = hashlib.md5()
 
-    with open(path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b''):
-            md5.update(chunk)
+    with open(path, 'rb', buffering=0) as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        size = os.fstat(f.fileno()).st_size
+        buf = bytearray(_MD5_BUFFER_SIZE)
+        view = memoryview(buf)
 
-    return md5.hexdigest()
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            md5.update(view[:n])
+
+    return md5.hexdigest(), size
+
+
+def _md5_of_file(path):
+    """Compute and return the MD5 sum of a flat file as a hexadecimal string.
+
+    """
+    return _md5_and_size_of_file(path)[0]
 
 
 def get_md5_from_path(path):
@@ -141,9 +174,22 @@ def get_md5_from_path(path):
     For each input file, the 'md5sum' program prints the MD5 sum, two spaces,
     and then the file name. This sets the format for the outermost MD5 we do.
 
+    """
+    return _get_md5_and_size_from_path(path)[0]
+
+
+def _get_md5_and_size_from_path(path):
+    """Compute both the MD5 checksum of 'path', as described in
+    `get_md5_from_path`, and its size, as described in `get_size_from_path`.
+    Returns a tuple `(md5, size)`.
+
+    We have to read every byte of the data to checksum them, so we might as
+    well add up the sizes as we go, rather than walking the tree all over
+    again.
+
     """
     if not os.path.isdir(path):
-        return _md5_of_file(path)
+        return _md5_and_size_of_file(path)
 
     # make sure that path looks like foo/bar, not foo/bar/ or foo/bar/./. .
     # This makes it easier to munge the outputs from os.walk().
@@ -154,30 +200,45 @@ def get_md5_from_path(path):
     if path[-1] == '/':
         path = path[:-1]
 
+    # We walk the tree with bytes paths. Sorting these gives the same order as
+    # `LC_ALL=C sort`, which is what we want, and they go straight into the
+    # hash without any re-encoding. (Unlike the setlocale() call we used to
+    # make, this also works when file names aren't valid UTF-8.)
+
+    bpath = os.fsencode(path)
+
     def all_files():
-        for dirname, dirs, files in os.walk(path):
+        for dirname, dirs, files in os.walk(bpath):
             for f in files:
-                yield dirname + '/' + f
+                yield dirname + b'/' + f
 
     md5 = hashlib.md5()
-    plen = len(path)
+    plen = len(bpath)
+    files = sorted(all_files())
 
-    try:
-        # NOTE: this is not threadsafe. This will *probably* never come back
-        # to bite us in the ass ...
-        prevlocale = locale.getlocale(locale.LC_COLLATE)
-        locale.setlocale(locale.LC_COLLATE, 'C')
+    # MIRIAD data sets contain several files, and hashlib releases the GIL
+    # while it's crunching, so we hash them in parallel. map() gives us back
+    # the sums in the order that we need to combine them.
+    if len(files) > 1:
+        from multiprocessing.pool import ThreadPool
 
-        for f in sorted(all_files()):
-            subhash = _md5_of_file(f).encode("utf-8")
-            md5.update(subhash)  # this is the hex digest, like we want
-            md5.update('  .'.encode("utf-8"))  # compat with command-line approach
-            md5.update(f[plen:].encode("utf-8"))
-            md5.update('\n'.encode("utf-8"))
-    finally:
-        locale.setlocale(locale.LC_COLLATE, prevlocale)
+        pool = ThreadPool(min(len(files), _MD5_DIR_THREADS))
+        try:
+            results = pool.map(_md5_and_size_of_file, files)
+        finally:
+            pool.close()
+    else:
+        results = [_md5_and_size_of_file(f) for f in files]
+
+    size = 0
 
-    return md5.hexdigest()
+    for f, (subhash, subsize) in zip(files, results):
+        # This is the hex digest, like we want, and the line format of the
+        # command-line approach.
+        md5.update(b'%s  .%s\n' % (subhash.encode('ascii'), f[plen:]))
+        size += subsize
+
+    return md5.hexdigest(), size
 
 
 def get_size_from_path(path):
@@ -187,14 +248,27 @@ def get_size_from_path(path):
     contains.
 
     """
-    if not os.path.isdir(path):
-        return os.path.getsize(path)
+    st = os.stat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        return st.st_size
+
+    # We use os.scandir() directly rather than os.walk(): the directory
+    # entries tell us their types without extra system calls, and we don't
+    # need to build up a full path string for every file just to stat it. As
+    # with os.walk(), we don't descend into symlinks to directories, but we do
+    # count the sizes of the files that other symlinks point to.
 
     size = 0
+    todo = [path]
 
-    for dirname, dirs, files in os.walk(path):
-        for f in files:
-            size += os.path.getsize(dirname + '/' + f)
+    while len(todo):
+        with os.scandir(todo.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        todo.append(entry.path)
+                else:
+                    size += entry.stat().st_size
 
     return size
 
@@ -202,8 +276,7 @@ def get_size_from_path(path):
 def gather_info_for_path(path):
     info = {}
     info['type'] = get_type_from_path(path)
-    info['md5'] = get_md5_from_path(path)
-    info['size'] = get_size_from_path(path)
+    info['md5'], info['size'] = _get_md5_and_size_from_path(path)
 
     obsid = get_obsid_from_path(path)
     if obsid is not None:
@@ -106,6 +106,8 @@ class File (db.Model):
     instances = db.relationship('FileInstance', back_populates='file')
     events = db.relationship('FileEvent', back_populates='file')
 
+    obsid_index = db.Index('file_obsid', obsid)
+
     def __init__(self, name, type, obsid, source, size, md5, create_time=None):
         if create_time is None:
             # We round our times to whole seconds so that they can be
@@ -537,6 +539,9 @@ class FileEvent (db.Model):
 
     name_index = db.Index('file_event_name', name)
 
+    # Standing orders look for files lacking an event of a given type.
+    type_name_index = db.Index('file_event_type_name', type, name)
+
     def __init__(self, name, type, payload_struct):
         if '/' in name:
             raise ValueError('illegal file name "%s": names may not contain "/"' % name)
@@ -590,19 +595,20 @@ def locate_file_instance(args, sourcename=None):
     """
     file_name = required_arg(args, str, 'file_name')
 
-    file = File.query.get(file_name)
-    if file is None:
-        raise ServerError('no known file "%s"', file_name)
+    # We only need one instance, so don't load up all of them.
+    inst = FileInstance.query.filter(FileInstance.name == file_name).first()
 
-    for inst in file.instances:
-        return {
-            'full_path_on_store': inst.full_path_on_store(),
-            'store_name': inst.store_name,
-            'store_path': inst.store_path,
-            'store_ssh_host': inst.store_object.ssh_host,
-        }
+    if inst is None:
+        if File.query.get(file_name) is None:
+            raise ServerError('no known file "%s"', file_name)
+        raise ServerError('no instances of file "%s" on this librarian', file_name)
 
-    raise ServerError('no instances of file "%s" on this librarian', file_name)
+    return {
+        'full_path_on_store': inst.full_path_on_store(),
+        'store_name': inst.store_name,
+        'store_path': inst.store_path,
+        'store_ssh_host': inst.store_object.ssh_host,
+    }
 
 
 @app.route('/api/set_one_file_deletion_policy', methods=['GET', 'POST'])
@@ -627,27 +633,28 @@ def set_one_file_deletion_policy(args, sourcename=None):
         from .store import Store
         restrict_to_store = Store.get_by_name(restrict_to_store)  # ServerError if lookup fails
 
-    file = File.query.get(file_name)
-    if file is None:
-        raise ServerError('no known file "%s"', file_name)
-
     deletion_policy = DeletionPolicy.parse_safe(deletion_policy)
 
-    for inst in file.instances:
-        # We could do this filter in SQL but it's easier to just do it this way;
-        # you can't call filter() on `file.instances`.
-        if restrict_to_store is not None and inst.store != restrict_to_store.id:
-            continue
+    # Have the database pick out the one instance we want, rather than loading
+    # all of them and filtering here. We only need to look at the File record
+    # itself to figure out which error to report.
+    q = FileInstance.query.filter(FileInstance.name == file_name)
+    if restrict_to_store is not None:
+        q = q.filter(FileInstance.store == restrict_to_store.id)
 
-        inst.deletion_policy = deletion_policy
-        break  # just one!
-    else:
+    inst = q.first()  # just one!
+    if inst is None:
+        if File.query.get(file_name) is None:
+            raise ServerError('no known file "%s"', file_name)
         raise ServerError('no instances of file "%s" on this librarian', file_name)
 
-    db.session.add(file.make_generic_event('instance_deletion_policy_changed',
-                                           store_name=inst.store_object.name,
-                                           parent_dirs=inst.parent_dirs,
-                                           new_policy=deletion_policy))
+    inst.deletion_policy = deletion_policy
+
+    # This is File.make_generic_event(), without loading the File.
+    db.session.add(FileEvent(file_name, 'instance_deletion_policy_changed',
+                             dict(store_name=inst.store_object.name,
+                                  parent_dirs=inst.parent_dirs,
+                                  new_policy=deletion_policy)))
 
     try:
         db.session.commit()
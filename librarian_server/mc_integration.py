@@ -35,6 +35,9 @@ from .webutil import ServerError
 # M&C severity classes
 FATAL, SEVERE, WARNING, INFO = range(1, 5)
 
+# Maximum number of remote Librarians to ping simultaneously when checking in.
+MAX_CONCURRENT_PINGS = 8
+
 
 class MCManager(object):
     """A simple singleton class that checks in with M&C. Only gets created if M&C
@@ -65,6 +68,12 @@ class MCManager(object):
         self._remote_upload_stats = {}
         self._last_report_time = time.time()
 
+        # Clients for pinging the remotes, kept between check-ins so that we
+        # don't re-read the client configuration file, or set up a new HTTP
+        # connection, for every ping.
+
+        self._remote_clients = {}
+
     def error(self, severity, fmt, *args):
         if len(args):
             text = fmt % args
@@ -153,28 +162,26 @@ class MCManager(object):
         # corner cases the bandwidth will get wonky, but we also have the
         # direct measurements from the pots to look at.
 
+        # We also need the ping times of all of the remotes. Each ping is a
+        # network round-trip that can take a while, so we do them all at
+        # once in a small thread pool rather than one after the other.
+
+        conn_names = list(self._remote_upload_stats.keys())
+        ping_times = {}
+
+        if len(conn_names):
+            from multiprocessing.pool import ThreadPool
+            pool = ThreadPool(min(len(conn_names), MAX_CONCURRENT_PINGS))
+            try:
+                ping_times = dict(zip(conn_names, pool.map(self._ping_remote, conn_names)))
+            finally:
+                pool.close()
+
         for conn_name, file_sizes in six.iteritems(self._remote_upload_stats):
             num_file_uploads = len(file_sizes)
             bytes_uploaded = sum(file_sizes)  # this works when the list is empty.
             bandwidth_Mbs = bytes_uploaded * 8 / (1024**2 * (unix_now - self._last_report_time))
-
-            # Now we need to get the ping time. Here on the server we don't
-            # have easy access to the hostnames of their remote Librarian's
-            # stores, but we can make RPC calls to it. And, what do you know,
-            # there's a ping RPC call! So we measure the roundtrip time for
-            # that to execute.
-
-            from hera_librarian import LibrarianClient, RPCError
-            client = LibrarianClient(conn_name)
-            t0 = time.time()
-
-            try:
-                client.ping()
-            except RPCError as e:
-                logger.warning('couldn\'t ping remote "%s": %s', conn_name, e)
-                ping_time = 999
-            else:
-                ping_time = time.time() - t0
+            ping_time = ping_times[conn_name]
 
             # OK now we're ready to file our report!
 
@@ -190,6 +197,32 @@ class MCManager(object):
 
         self._last_report_time = time.time()
 
+    def _ping_remote(self, conn_name):
+        """Measure the ping time to a remote Librarian, in seconds.
+
+        Here on the server we don't have easy access to the hostnames of
+        their remote Librarian's stores, but we can make RPC calls to it. And,
+        what do you know, there's a ping RPC call! So we measure the roundtrip
+        time for that to execute. This gets run in a worker thread, so it
+        mustn't touch the databases.
+
+        """
+        from hera_librarian import LibrarianClient, RPCError
+
+        client = self._remote_clients.get(conn_name)
+        if client is None:
+            client = self._remote_clients[conn_name] = LibrarianClient(conn_name)
+
+        t0 = time.monotonic()
+
+        try:
+            client.ping()
+        except (RPCError, OSError) as e:
+            logger.warning('couldn\'t ping remote "%s": %s', conn_name, e)
+            return 999
+
+        return time.monotonic() - t0
+
     def is_file_record_invalid(self, file_obj):
         """This function is kind-sorta superseded by create_observation_record(), but
         can still have a role to play if file records are uploaded to an
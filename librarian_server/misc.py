@@ -11,7 +11,6 @@ gather_records
 
 from flask import flash, redirect, render_template, url_for
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm.exc import NoResultFound
 
 from . import app, db
 from .dbutil import SQLAlchemyError
@@ -62,9 +61,18 @@ def create_records(info, sourcename):
 
     from .mc_integration import is_file_record_invalid, note_file_created
 
-    for subinfo in info.get('files', {}).values():
-        obj = File.from_dict(sourcename, subinfo)
+    files = [File.from_dict(sourcename, subinfo)
+             for subinfo in info.get('files', {}).values()]
 
+    # Find out which of the files we already know about with one query, rather
+    # than one per file.
+    known_names = set()
+
+    if len(files):
+        known_names.update(name for (name,) in
+                           db.session.query(File.name).filter(File.name.in_([f.name for f in files])))
+
+    for obj in files:
         # Things get slightly more complicated here because if we're linked in
         # to HERA M&C, we need to check if files are valid, and report when
         # new File records are created. I don't think `merge()` gives us any
@@ -83,9 +91,7 @@ def create_records(info, sourcename):
             raise ServerError('new file %s (obsid %s) rejected by M&C; see M&C error logs for the reason',
                               obj.name, obj.obsid)
 
-        try:
-            db.session.query(File).filter_by(name=obj.name).one()
-        except NoResultFound:
+        if obj.name not in known_names:
             try:
                 db.session.add(obj)
                 db.session.flush()
@@ -123,7 +129,10 @@ def ensure_dirs_gw(path, _parent_mode=False):
     head, tail = os.path.split(path)  # /a/b/c => /a/b, c
     if not len(tail):  # if we got something like "a/b/" => ("a/b", "")
         head, tail = os.path.split(head)
-    if len(head) and head != '/':
+    # Like os.makedirs(), only climb as far up as we need to. Parents that
+    # already exist are left untouched anyway, so there's no point in trying
+    # to mkdir every one of them up to the root.
+    if len(head) and head != '/' and not os.path.isdir(head):
         ensure_dirs_gw(head, _parent_mode=True)
 
     try_chmod = not _parent_mode  # deepest directory must be g+wxs
@@ -160,6 +169,79 @@ def ensure_dirs_gw(path, _parent_mode=False):
                 raise
 
 
+def _copy_file_data(src, dst, extra_mode=0):
+    """Copy the contents of the flat file *src* to *dst*, like
+    shutil.copyfile. The new file gets the default permissions, plus any mode
+    bits set in *extra_mode*.
+
+    Staged files can be many gigabytes, so where we can we have the kernel
+    move the data, rather than shuttling every byte through a userspace
+    buffer. We first try copy_file_range(2), which can clone the data
+    outright on filesystems that support reflinks, then sendfile(2). If
+    neither is available or supported for these files, we fall back to a
+    plain read/write copy. The mode is fixed up through the open file
+    descriptor, which saves a couple of path lookups per file when staging
+    big directory trees.
+
+    """
+    import errno
+    import os
+    import stat
+    from shutil import copyfileobj
+
+    # Errors meaning "this call doesn't work for these files", as opposed to
+    # actual I/O problems. (EXDEV: cross-filesystem copy_file_range on older
+    # kernels.)
+    unsupported = (errno.EINVAL, errno.ENOSYS, errno.EXDEV, errno.EOPNOTSUPP,
+                   getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP))
+
+    def kernel_copy(copy_chunk, size):
+        # Returns False if nothing could be copied because `copy_chunk`
+        # isn't supported here. Explicit offsets are used throughout, so in
+        # that case the file positions haven't moved.
+        offset = 0
+
+        try:
+            while offset < size:
+                # Cap the count to keep 32-bit platforms happy.
+                n = copy_chunk(offset, min(size - offset, 0x40000000))
+                if n == 0:
+                    break  # file shrank underneath us
+                offset += n
+        except OSError as e:
+            if offset > 0 or e.errno not in unsupported:
+                raise
+            return False
+
+        return True
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        in_fd = fsrc.fileno()
+        out_fd = fdst.fileno()
+        size = os.fstat(in_fd).st_size
+        copied = False
+
+        if hasattr(os, 'copy_file_range'):
+            copied = kernel_copy(
+                lambda offset, count: os.copy_file_range(in_fd, out_fd, count, offset, offset),
+                size
+            )
+
+        if not copied and hasattr(os, 'sendfile'):
+            copied = kernel_copy(
+                lambda offset, count: os.sendfile(out_fd, in_fd, offset, count),
+                size
+            )
+
+        if not copied:
+            copyfileobj(fsrc, fdst)
+
+        if extra_mode:
+            mode = stat.S_IMODE(os.fstat(out_fd).st_mode)
+            if mode | extra_mode != mode:
+                os.fchmod(out_fd, mode | extra_mode)
+
+
 def copyfiletree(src, dst):
     """Something like shutil.copytree that just copies data, not mode
     bits, and that will accept either a file or a directory as input.
@@ -173,33 +255,111 @@ def copyfiletree(src, dst):
     files/dirs created for them, which is super annoying.
 
     """
-    import os.path
-    from shutil import copyfile
+    import os
     import stat
 
-    try:
-        items = os.listdir(src)
-    except OSError as e:
-        if e.errno == 20:  # not a directory?
-            copyfile(src, dst)
-            st = os.stat(dst)  # NOTE! not src; we explicitly do not preserve perms
-            mode = stat.S_IMODE(st.st_mode)
-            mode |= (stat.S_IWUSR | stat.S_IWGRP)
-            os.chmod(dst, mode)
-            return
-        raise
-
-    os.mkdir(dst)
-    st = os.stat(dst)  # NOTE! not src; we explicitly do not preserve perms
-    mode = stat.S_IMODE(st.st_mode)
-    mode |= (stat.S_IWUSR | stat.S_IWGRP | stat.S_IXUSR | stat.S_IXGRP | stat.S_ISGID)
-    os.chmod(dst, mode)
-
-    for item in items:
-        copyfiletree(
-            os.path.join(src, item),
-            os.path.join(dst, item)
-        )
+    file_extra_mode = stat.S_IWUSR | stat.S_IWGRP
+    dir_extra_mode = stat.S_IWUSR | stat.S_IWGRP | stat.S_IXUSR | stat.S_IXGRP | stat.S_ISGID
+
+    def copy_dir(src, dst):
+        os.mkdir(dst)
+        st = os.stat(dst)  # NOTE! not src; we explicitly do not preserve perms
+        mode = stat.S_IMODE(st.st_mode)
+        new_mode = mode | dir_extra_mode
+        if new_mode != mode:
+            os.chmod(dst, new_mode)
+
+        # The directory entries usually tell us their types without another
+        # system call, so we don't need to probe every file with listdir()
+        # to find out whether it's a directory. Like listdir(), is_dir()
+        # follows symlinks.
+        with os.scandir(src) as entries:
+            for entry in entries:
+                item_dst = os.path.join(dst, entry.name)
+
+                if entry.is_dir():
+                    copy_dir(entry.path, item_dst)
+                else:
+                    # NOTE! we explicitly do not preserve the perms of src
+                    _copy_file_data(entry.path, item_dst, extra_mode=file_extra_mode)
+
+    if os.path.isdir(src):
+        copy_dir(src, dst)
+    else:
+        _copy_file_data(src, dst, extra_mode=file_extra_mode)
+
+
+def copyfiletree_with_command(copy_command, src, dst):
+    """Like copyfiletree, but have an external program copy the data.
+
+    The program is invoked as `copy_command + [src, dst]`, where *dst* does
+    not yet exist, so `["cp", "-rL", "--reflink=auto"]` is a sensible
+    choice. On copy-on-write filesystems like XFS and Btrfs, that can "copy"
+    huge directories almost instantly by sharing their data blocks. The
+    command should follow symlinks, as copyfiletree does, so that the copy
+    doesn't just point back into the store. After the copy completes, the
+    new files and directories are made group-writeable in the same way that
+    copyfiletree does.
+
+    Like copyfiletree, we refuse to copy onto an existing *dst*; `cp -r`
+    would quietly nest the copy inside of it instead.
+
+    """
+    import errno
+    import os
+    import stat
+    import subprocess
+    import sys
+
+    if os.path.lexists(dst):
+        raise OSError(errno.EEXIST, os.strerror(errno.EEXIST), dst)
+
+    def run(argv):
+        with open(os.devnull, 'rb') as devnull:
+            subprocess.check_output(
+                argv,
+                stdin=devnull,
+                stderr=subprocess.STDOUT,
+                shell=False,
+                close_fds=True,
+            )
+
+    run(list(copy_command) + [src, dst])
+
+    if os.path.islink(dst):
+        return  # nothing of our own to fix up
+
+    if sys.platform.startswith('linux'):
+        # Fixing up the modes one entry at a time from Python is slow for
+        # big trees. GNU chmod and find can do it in two processes; neither
+        # follows symlinks that they encounter while recursing.
+        run(['chmod', '-R', 'ug+w', dst])
+        if os.path.isdir(dst):
+            run(['find', dst, '-type', 'd', '-exec', 'chmod', 'ug+x,g+s', '{}', '+'])
+        return
+
+    file_bits = stat.S_IWUSR | stat.S_IWGRP
+    dir_bits = file_bits | stat.S_IXUSR | stat.S_IXGRP | stat.S_ISGID
+
+    def fix_mode(path, bits):
+        st = os.lstat(path)
+        if stat.S_ISLNK(st.st_mode):
+            return  # chmod would follow it and alter the link target instead
+        mode = stat.S_IMODE(st.st_mode)
+        if mode | bits != mode:
+            os.chmod(path, mode | bits)
+
+    if not os.path.isdir(dst):
+        fix_mode(dst, file_bits)
+        return
+
+    fix_mode(dst, dir_bits)
+
+    for dirpath, dirnames, filenames in os.walk(dst):
+        for name in dirnames:
+            fix_mode(os.path.join(dirpath, name), dir_bits)
+        for name in filenames:
+            fix_mode(os.path.join(dirpath, name), file_bits)
 
 
 # Misc ...
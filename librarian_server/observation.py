@@ -154,6 +154,8 @@ class Observation (db.Model):
     session = db.relationship('ObservingSession', back_populates='observations')
     files = db.relationship('File', back_populates='observation')
 
+    session_id_index = db.Index('observation_session_id', session_id)
+
     def __init__(self, obsid, start_time_jd, stop_time_jd, start_lst_hr):
         self.obsid = obsid
         self.start_time_jd = start_time_jd
@@ -730,7 +730,8 @@ class StagerTask(bgtasks.BackgroundTask):
 
     """
 
-    def __init__(self, dest, stage_info, bytes, user, chown_command):
+    def __init__(self, dest, stage_info, bytes, user, chown_command, n_threads=1,
+                 copy_command=None):
         """Arguments:
 
         dest (str)
@@ -744,12 +745,20 @@ class StagerTask(bgtasks.BackgroundTask):
         chown_command (list of str)
           Beginning of the command line that will be used to change
           file ownership after staging is complete.
+        n_threads (integer)
+          The number of files to copy simultaneously.
+        copy_command (list of str or None)
+          If not None, the beginning of a command line that will be used to
+          copy the data, rather than copying them in Python; see
+          `misc.copyfiletree_with_command`.
 
         """
         self.dest = dest
         self.stage_info = stage_info
         self.user = user
         self.chown_command = chown_command
+        self.n_threads = n_threads
+        self.copy_command = copy_command
         self.desc = 'stage %d bytes to %s' % (bytes, dest)
 
         import os.path
@@ -793,25 +802,44 @@ class StagerTask(bgtasks.BackgroundTask):
 
         self.failures = []
 
-    def thread_function(self):
+    def _stage_one(self, item):
         import os
-        import subprocess
-        from .misc import copyfiletree, ensure_dirs_gw
+        from .misc import copyfiletree, copyfiletree_with_command, ensure_dirs_gw
 
-        for store_prefix, parent_dirs, name in self.stage_info:
-            source = os.path.join(store_prefix, parent_dirs, name)
-            dest_pfx = os.path.join(self.dest, parent_dirs)
-            dest = os.path.join(self.dest, parent_dirs, name)
+        store_prefix, parent_dirs, name = item
+        source = os.path.join(store_prefix, parent_dirs, name)
+        dest_pfx = os.path.join(self.dest, parent_dirs)
+        dest = os.path.join(self.dest, parent_dirs, name)
 
-            try:
-                ensure_dirs_gw(dest_pfx)
-            except Exception as e:
-                self.failures.append((dest_pfx, str(e)))
+        try:
+            ensure_dirs_gw(dest_pfx)
+        except Exception as e:
+            self.failures.append((dest_pfx, str(e)))
 
-            try:
+        try:
+            if self.copy_command is None:
                 copyfiletree(source, dest)
-            except Exception as e:
-                self.failures.append((dest, str(e)))
+            else:
+                copyfiletree_with_command(self.copy_command, source, dest)
+        except Exception as e:
+            self.failures.append((dest, str(e)))
+
+    def thread_function(self):
+        import os
+        import subprocess
+        from multiprocessing.pool import ThreadPool
+
+        # The copies are I/O-bound, and both the RAID arrays and Lustre keep
+        # up better with several of them in flight at once than with one at a
+        # time. ensure_dirs_gw() tolerates directories being created
+        # concurrently.
+
+        pool = ThreadPool(max(min(self.n_threads, len(self.stage_info)), 1))
+        try:
+            pool.map(self._stage_one, self.stage_info)
+        finally:
+            pool.close()
+            pool.join()
 
         if len(self.failures):
             raise Exception('failures while attempting to create and copy files')
@@ -924,8 +952,15 @@ def launch_stage_operation(user, search, stage_dest):
             seen_names.add(inst.name)
             stage_info.append((store.path_prefix, inst.parent_dirs, inst.name))
 
+    # Copy things in on-disk order, so that files in the same directory of the
+    # same store get read one after another rather than scattered throughout
+    # the run.
+    stage_info.sort()
+
     bgtasks.submit_background_task(StagerTask(
-        dest, stage_info, n_bytes, user, lds_info['chown_command']))
+        dest, stage_info, n_bytes, user, lds_info['chown_command'],
+        n_threads=lds_info.get('n_copy_threads', 4),
+        copy_command=lds_info.get('copy_command')))
 
     return dest, len(info), n_bytes
 
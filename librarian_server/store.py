@@ -26,6 +26,7 @@ OffloaderTask
 ''').split()
 
 import os.path
+import sys
 
 from flask import flash, redirect, render_template, url_for
 
@@ -386,19 +387,34 @@ def register_instances(args, sourcename=None):
 
     # Sort the files to get the creation times to line up.
 
+    todo = []
+
     for full_path in sorted(file_info.keys()):
         if not full_path.startswith(slashed_prefix):
             raise ServerError('file path %r should start with "%s"',
                               full_path, slashed_prefix)
 
-        # Do we already know about this instance? If so, just ignore it.
-
         store_path = full_path[len(slashed_prefix):]
-        parent_dirs = os.path.dirname(store_path)
-        name = os.path.basename(store_path)
+        todo.append((full_path, store_path, os.path.dirname(store_path),
+                     os.path.basename(store_path)))
 
-        instance = FileInstance.query.get((store.id, parent_dirs, name))
-        if instance is not None:
+    # Find out which instances we already know about with one query, rather
+    # than one per file.
+
+    known_instances = set()
+
+    if len(todo):
+        known_instances.update(
+            (parent_dirs, name) for parent_dirs, name in
+            db.session.query(FileInstance.parent_dirs, FileInstance.name)
+            .filter(FileInstance.store == store.id,
+                    FileInstance.name.in_([t[3] for t in todo]))
+        )
+
+    for full_path, store_path, parent_dirs, name in todo:
+        # Do we already know about this instance? If so, just ignore it.
+
+        if (parent_dirs, name) in known_instances:
             continue
 
         # OK, we have to create some stuff.
@@ -509,8 +525,10 @@ class UploaderTask(bgtasks.BackgroundTask):
             self.desc += ' (standing order "%s")' % standing_order_name
 
     def thread_function(self):
+        # We only use these to compute the transfer duration, so use a clock
+        # that can't jump around if the system time gets adjusted mid-upload.
         import time
-        self.t_start = time.time()
+        self.t_start = time.monotonic()
         self.store.upload_file_to_other_librarian(
             self.conn_name,
             self.rec_info,
@@ -523,7 +541,7 @@ class UploaderTask(bgtasks.BackgroundTask):
             transfer_token=self.transfer_token,
             source_endpoint_id=self.source_endpoint_id,
         )
-        self.t_finish = time.time()
+        self.t_finish = time.monotonic()
 
     def wrapup_function(self, retval, exc):
         # In principle, we might want different integer error codes if there are
@@ -609,11 +627,18 @@ def launch_copy_by_file_name(
     framework.
 
     """
-    # Find a local instance of the file
+    # Find a local instance of the file. We need its File and Store records
+    # too, so fetch all three at once; this is called for every file a standing
+    # order matches, and it saves the two extra round-trips that lazily loading
+    # `inst.file` and `inst.store_object` would cost.
 
-    from .file import FileInstance
-    inst = FileInstance.query.filter(FileInstance.name == file_name).first()
-    if inst is None:
+    from .file import File, FileInstance
+    row = (db.session.query(FileInstance, File, Store)
+           .join(File, File.name == FileInstance.name)
+           .join(Store, Store.id == FileInstance.store)
+           .filter(FileInstance.name == file_name)
+           .first())
+    if row is None:
         if no_instance == 'raise':
             raise ServerError('cannot upload %s: no local file instances with that name', file_name)
         elif no_instance == 'return':
@@ -621,7 +646,7 @@ def launch_copy_by_file_name(
         else:
             raise ValueError('unknown value for no_instance: %r' % (no_instance, ))
 
-    file = inst.file
+    inst, file, store = row
 
     # Gather up information describing the database records that the other
     # Librarian will need.
@@ -648,7 +673,7 @@ def launch_copy_by_file_name(
 
     # Launch the background task. We need to convert the Store to a base object since
     # the background task can't access the database.
-    basestore = inst.store_object.convert_to_base_object()
+    basestore = store.convert_to_base_object()
     bgtasks.submit_background_task(
         UploaderTask(
             basestore,
@@ -858,6 +883,27 @@ class OffloaderTask (bgtasks.BackgroundTask):
 OFFLOAD_BATCH_SIZE = 200
 
 
+def _limit_offload_batch(rows, max_bytes):
+    """Given an iterable of (FileInstance, size) pairs, return the list of
+    instances to offload in one batch.
+
+    If *max_bytes* is not None, we stop before the total size of the batch
+    exceeds it. We always take at least one instance, however large, so that
+    repeated offloads make progress.
+
+    """
+    instances = []
+    batch_bytes = 0
+
+    for inst, size in rows:
+        batch_bytes += size
+        if max_bytes is not None and len(instances) and batch_bytes > max_bytes:
+            break
+        instances.append(inst)
+
+    return instances
+
+
 @app.route('/api/initiate_offload', methods=['GET', 'POST'])
 @json_api
 def initiate_offload(args, sourcename=None):
@@ -871,7 +917,8 @@ def initiate_offload(args, sourcename=None):
     that it can be shut down.
 
     To keep each task reasonably-sized, there is a limit to the number of
-    files that may be offloaded in each call to this API. Just keep calling it
+    files that may be offloaded in each call to this API, and optionally to
+    their total size (the "offload_batch_max_bytes" config item). Just keep calling it
     until the source store is emptied. The actual number of instances
     transferred in each batch is unpredictable because instances may be added
     to or removed from the store while the offload operation is running.
@@ -892,9 +939,9 @@ def initiate_offload(args, sourcename=None):
     source_store_name = required_arg(args, str, 'source_store_name')
     dest_store_name = required_arg(args, str, 'dest_store_name')
 
-    from sqlalchemy import func
+    from sqlalchemy import exists
     from sqlalchemy.orm import aliased
-    from .file import FileInstance
+    from .file import File, FileInstance
 
     source_store = Store.get_by_name(source_store_name)  # ServerError if failure
     dest_store = Store.get_by_name(dest_store_name)
@@ -905,19 +952,28 @@ def initiate_offload(args, sourcename=None):
     # correspond to files that have instances on other stores, which results in
     # some moderately messy SQL.
 
+    # We only care whether any other instance exists, not how many there are,
+    # so use EXISTS: the database can stop looking at the first one it finds.
+
     inst_alias = aliased(FileInstance)
 
-    n_other_stores = (db.session.query(func.count())
-                      .filter(inst_alias.name == FileInstance.name)
-                      .filter(inst_alias.store != source_store.id)
-                      .as_scalar())
+    on_other_stores = (exists()
+                       .where(inst_alias.name == FileInstance.name)
+                       .where(inst_alias.store != source_store.id))
 
-    q = (FileInstance.query
+    q = (db.session.query(FileInstance, File.size)
+         .join(File, File.name == FileInstance.name)
          .filter(FileInstance.store == source_store.id)
-         .filter(n_other_stores == 0)
+         .filter(~on_other_stores)
          .limit(OFFLOAD_BATCH_SIZE))
 
-    info = [InstanceOffloadInfo(i) for i in q]
+    # Batches of a few large files can take a very long time to copy, while
+    # batches of many small ones finish quickly. If so configured, also cap
+    # the total size of each batch so that tasks stay reasonably-sized either
+    # way.
+
+    max_bytes = app.config.get('offload_batch_max_bytes')
+    info = [InstanceOffloadInfo(inst) for inst in _limit_offload_batch(q, max_bytes)]
 
     # If no such instances exist, mark the store as unavailable, essentially
     # clearing it for deletion, and return.
@@ -947,16 +1003,19 @@ def initiate_offload(args, sourcename=None):
     return {'outcome': 'task-launched', 'instance-count': len(info)}
 
 
-@app.route('/stores/<string:name>/make-available', methods=['POST'])
-@login_required
-def make_store_available(name):
-    try:
-        store = Store.get_by_name(name)
-    except ServerError as e:
-        flash(str(e))
-        return redirect(url_for('stores'))
+def _set_store_availability(name, available):
+    """Shared implementation of the make-(un)available actions. We flip the flag
+    with a single UPDATE rather than loading the Store record just to change
+    one column.
 
-    store.available = True
+    """
+    n_updated = (Store.query.filter(Store.name == name)
+                 .update({Store.available: available}, synchronize_session=False))
+
+    if not n_updated:
+        db.session.rollback()
+        flash('No such store %r' % (name,))
+        return redirect(url_for('stores'))
 
     try:
         db.session.commit()
@@ -966,31 +1025,20 @@ def make_store_available(name):
         flash('Failed to update database?! See server logs for details.')
         return redirect(url_for('stores'))
 
-    flash('Marked store "%s" as available' % store.name)
-    return redirect(url_for('stores') + '/' + store.name)
+    flash('Marked store "%s" as %s' % (name, 'available' if available else 'unavailable'))
+    return redirect(url_for('stores') + '/' + name)
 
 
-@app.route('/stores/<string:name>/make-unavailable', methods=['POST'])
+@app.route('/stores/<string:name>/make-available', methods=['POST'])
 @login_required
-def make_store_unavailable(name):
-    try:
-        store = Store.get_by_name(name)
-    except ServerError as e:
-        flash(str(e))
-        return redirect(url_for('stores'))
-
-    store.available = False
+def make_store_available(name):
+    return _set_store_availability(name, True)
 
-    try:
-        db.session.commit()
-    except SQLAlchemyError:
-        db.session.rollback()
-        app.log_exception(sys.exc_info())
-        flash('Failed to update database?! See server logs for details.')
-        return redirect(url_for('stores'))
 
-    flash('Marked store "%s" as unavailable' % store.name)
-    return redirect(url_for('stores') + '/' + store.name)
+@app.route('/stores/<string:name>/make-unavailable', methods=['POST'])
+@login_required
+def make_store_unavailable(name):
+    return _set_store_availability(name, False)
 
 
 # Web user interface
@@ -0,0 +1,103 @@
+# -*- mode: python; coding: utf-8 -*-
+# Copyright 2019 the HERA Collaboration
+# Licensed under the 2-clause BSD License
+
+"""Test code in librarian_server/misc.py
+
+"""
+
+
+import pytest
+import os
+import stat
+import sys
+
+from librarian_server.misc import copyfiletree, copyfiletree_with_command
+
+
+COPY_COMMAND = ["cp", "-rL", "--reflink=auto"]
+
+
+@pytest.fixture
+def source_tree(tmpdir):
+    old_umask = os.umask(0o022)
+
+    # a file outside of the tree, linked to from inside of it
+    outside = os.path.join(str(tmpdir), "outside.txt")
+    with open(outside, "w") as f:
+        f.write("outside\n")
+
+    src = os.path.join(str(tmpdir), "src")
+    os.makedirs(os.path.join(src, "subdir"))
+    with open(os.path.join(src, "top.txt"), "w") as f:
+        f.write("top\n")
+    with open(os.path.join(src, "subdir", "inner.txt"), "w") as f:
+        f.write("inner\n")
+    os.symlink(outside, os.path.join(src, "link.txt"))
+
+    for path in (outside, os.path.join(src, "top.txt"), os.path.join(src, "subdir", "inner.txt")):
+        os.chmod(path, 0o644)
+    for path in (src, os.path.join(src, "subdir")):
+        os.chmod(path, 0o755)
+
+    yield src
+
+    os.umask(old_umask)
+
+
+def _describe_tree(root):
+    """Map each relative path in *root* to its type, mode, and contents."""
+    info = {}
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames + filenames:
+            path = os.path.join(dirpath, name)
+            st = os.lstat(path)
+            assert not stat.S_ISLNK(st.st_mode), "%s is a symlink" % path
+
+            if stat.S_ISDIR(st.st_mode):
+                contents = None
+            else:
+                with open(path) as f:
+                    contents = f.read()
+
+            info[os.path.relpath(path, root)] = (stat.S_ISDIR(st.st_mode), stat.S_IMODE(st.st_mode), contents)
+
+    info["."] = (True, stat.S_IMODE(os.lstat(root).st_mode), None)
+    return info
+
+
+@pytest.mark.parametrize("platform", [sys.platform, "notlinux"])
+def test_copyfiletree_with_command(tmpdir, source_tree, monkeypatch, platform):
+    # the external copy should end up just like copyfiletree's, whether the
+    # modes are fixed up with chmod/find or from Python
+    monkeypatch.setattr(sys, "platform", platform)
+
+    expected = os.path.join(str(tmpdir), "expected")
+    copyfiletree(source_tree, expected)
+    dst = os.path.join(str(tmpdir), "dst")
+    copyfiletree_with_command(COPY_COMMAND, source_tree, dst)
+
+    info = _describe_tree(dst)
+    assert info == _describe_tree(expected)
+    assert info["link.txt"] == (False, 0o664, "outside\n")
+    assert info["subdir"] == (True, 0o2775, None)
+
+    return
+
+
+def test_copyfiletree_with_command_existing_dest(tmpdir, source_tree):
+    # like copyfiletree, refuse to copy onto something that already exists,
+    # rather than nesting the copy inside of it
+    dst = os.path.join(str(tmpdir), "dst")
+    os.mkdir(dst)
+
+    with pytest.raises(OSError):
+        copyfiletree(source_tree, dst)
+
+    with pytest.raises(OSError):
+        copyfiletree_with_command(COPY_COMMAND, source_tree, dst)
+
+    assert os.listdir(dst) == []
+
+    return
@@ -11,7 +11,7 @@ import pytest
 import urllib.request, urllib.error, urllib.parse
 
 from . import ALL_FILES, filetypes, obsids, md5sums, pathsizes
-from librarian_server import webutil
+from librarian_server import store, webutil
 from librarian_server.webutil import AuthFailedError, ServerError
 
 
@@ -19,3 +19,24 @@ from librarian_server.webutil import AuthFailedError, ServerError
 def test_initiate_upload():
     # test uploading a datafile
     pass
+
+
+def test_limit_offload_batch():
+    # the instances themselves are opaque to the batching logic
+    rows = [("a", 40), ("b", 30), ("c", 20), ("d", 10)]
+
+    # no cap: take everything the query gave us
+    assert store._limit_offload_batch(rows, None) == ["a", "b", "c", "d"]
+
+    # stop before the batch exceeds the cap; hitting it exactly is fine
+    assert store._limit_offload_batch(rows, 75) == ["a", "b"]
+    assert store._limit_offload_batch(rows, 90) == ["a", "b", "c"]
+
+    # always take at least one instance, even if it is over the cap by itself
+    assert store._limit_offload_batch(rows, 10) == ["a"]
+    assert store._limit_offload_batch([("big", 1000), ("small", 1)], 100) == ["big"]
+
+    # nothing to offload
+    assert store._limit_offload_batch([], 100) == []
+
+    return